@@ -3,26 +3,31 @@
 This module sets up a mock plex server using Flask, ngrok for public HTTPS access, and defines routes for handling different tasks. It includes functionality for session management, encoding content, caching, handling media provider routes, metadata, availability, search, download, and agent routes. It also sets up the mock servers based on configurations and runs the Flask application in a separate thread.
 """
 
-from flask import Flask, request
+from flask import Flask, request, g
 from flask_caching import Cache
 from pyngrok import ngrok, conf, process
+from concurrent.futures import Future
 import threading
 import logging
-import json
 import zlib
-import requests
-import regex
+from urllib.parse import unquote
 from dicttoxml import dicttoxml
+from xml.sax.saxutils import escape
 from modules import common
 from modules import plex
 from modules import torrentio
 from modules import realdebrid
 from settings import settings
 import time
-import copy
-import uuid
+import secrets
 import os
 
+# waitress is optional, it replaces the Flask development server when it is installed
+try:
+    from waitress import serve
+except ImportError:
+    serve = None
+
 # Create a logger object for this module
 logger = logging.getLogger(__name__)
 
@@ -31,6 +36,39 @@ session = common.session()
 
 # Specify the port number for the Flask application
 PORT = 8008
+# Number of worker threads serving requests when running on waitress
+SERVER_THREADS = 16
+
+# Compression level for response bodies, higher levels cost a lot of cpu for little gain on small json/xml responses
+COMPRESSION_LEVEL = settings.get("compression level", 1)
+# Responses smaller than this (in bytes) are sent uncompressed
+COMPRESSION_THRESHOLD = 860
+
+# Maximum number of stored release lists that can be downloaded from
+DATA_STORE_SIZE = 1024
+# Time (in seconds) a stored release list can be downloaded from
+DATA_STORE_TTL = 600
+
+# Maximum number of formatted static responses that are kept
+FORMATTED_RESPONSE_CACHE_SIZE = 256
+# Time (in seconds) a formatted static response is reused
+FORMATTED_RESPONSE_CACHE_TTL = 3600
+
+# Maximum number of items whose scrape results are kept
+SCRAPE_CACHE_SIZE = 1024
+# Time (in seconds) scrape results are reused for further requests of the same item
+SCRAPE_CACHE_TTL = 300
+
+# Headers sent with every response, format() adds the content specific ones to a copy
+RESPONSE_HEADERS = {
+    'Access-Control-Allow-Origin': '*',
+    'X-Plex-Protocol': '1.0',
+    'Vary': 'Origin, X-Plex-Token, Accept-Encoding',
+    'Connection': 'keep-alive'
+}
+
+# Quote characters escaped in xml text, on top of the &, < and > handled by xml.sax.saxutils.escape
+XML_ENTITIES = {'"': '&quot;', "'": '&apos;'}
 
 
 def configure_logging():
@@ -46,88 +84,234 @@ app = Flask(__name__)
 # Set up caching for the Flask application with simple backend and default timeout
 cache = Cache(app, config={'CACHE_TYPE': 'simple', "CACHE_DEFAULT_TIMEOUT": 300})
 
-# Configure the default region for ngrok and connect to establish a public URL
-conf.get_default().region = 'us'
-public_url = ngrok.connect(PORT)
-
-# Silence the Flask, Ngrok and dicttoxml loggers
+# Silence the Flask, Waitress, Ngrok and dicttoxml loggers
 logging.getLogger('werkzeug').setLevel(logging.WARNING)
+logging.getLogger('waitress').setLevel(logging.WARNING)
 logging.getLogger('dicttoxml').setLevel(logging.WARNING)
 process.logger.setLevel(logging.WARNING)
 process.ngrok_logger.setLevel(logging.WARNING)
 
-# Start the Flask application in a separate thread to allow concurrent processing
-threading.Thread(target=app.run, kwargs={
-    'use_reloader': False,
-    'debug': False,
-    'port': PORT
-}).start()
+# Start the Flask application in a separate thread to allow concurrent processing.
+# Waitress serves requests from a pool of worker threads, the Flask development server is the fallback.
+if serve:
+    threading.Thread(target=serve, args=(app,), kwargs={
+        'host': '127.0.0.1',
+        'port': PORT,
+        'threads': SERVER_THREADS,
+        '_quiet': True
+    }).start()
+else:
+    threading.Thread(target=app.run, kwargs={
+        'use_reloader': False,
+        'debug': False,
+        'threaded': True,
+        'port': PORT
+    }).start()
+
+# Configure the default region for ngrok and connect to establish a public URL.
+# This happens after the server thread is started, so the server starts up while ngrok connects.
+conf.get_default().region = 'us'
+public_url = ngrok.connect(PORT)
 
 # Initialize mock Plex servers based on settings and the obtained ngrok public URL
 mock_servers = [plex.mockserver(server, public_url.public_url) for server in settings.get("versions")]
+# Map the mock server identifiers to their servers for constant time lookups in the routes
+servers_by_id = {server.IDENTIFIER: server for server in mock_servers}
 
 
 def zlib_encode(content):
-    """Compress content using zlib with highest compression level."""
-    zlib_compress = zlib.compressobj(9, zlib.DEFLATED, zlib.MAX_WBITS)
-    data = zlib_compress.compress(content) + zlib_compress.flush()
-    return data
+    """Compress content using zlib."""
+    return zlib.compress(content, COMPRESSION_LEVEL, zlib.MAX_WBITS)
 
 
 def deflate_encode(content):
     """Compress content using deflate algorithm."""
-    deflate_compress = zlib.compressobj(9, zlib.DEFLATED, -zlib.MAX_WBITS)
-    data = deflate_compress.compress(content) + deflate_compress.flush()
-    return data
+    return zlib.compress(content, COMPRESSION_LEVEL, -zlib.MAX_WBITS)
 
 
 def gzip_encode(content):
     """Compress content using gzip algorithm."""
-    gzip_compress = zlib.compressobj(9, zlib.DEFLATED, zlib.MAX_WBITS | 16)
-    data = gzip_compress.compress(content) + gzip_compress.flush()
-    return data
+    return zlib.compress(content, COMPRESSION_LEVEL, zlib.MAX_WBITS | 16)
 
 
-def format(content, request):
+def xml_element(key, value, parts):
+    """Append the xml representation of a key/value pair to a list of string parts.
+
+    Produces the same markup as dicttoxml(content, root=False, attr_type=False), without its
+    per element name validation and logging.
+    """
+    if isinstance(value, dict):
+        parts.append(f'<{key}>')
+        for k, v in value.items():
+            xml_element(k, v, parts)
+        parts.append(f'</{key}>')
+    elif isinstance(value, list):
+        parts.append(f'<{key}>')
+        for item in value:
+            xml_element('item', item, parts)
+        parts.append(f'</{key}>')
+    elif isinstance(value, bool):
+        parts.append(f'<{key}>{"true" if value else "false"}</{key}>')
+    elif value is None:
+        parts.append(f'<{key}></{key}>')
+    else:
+        parts.append(f'<{key}>{escape(str(value), XML_ENTITIES)}</{key}>')
+
+
+def xml_encode(content):
+    """Convert response content to xml.
+
+    Known MediaContainer responses are rendered by `xml_element`, anything else falls back to dicttoxml.
+    """
+    if len(content) != 1 or 'MediaContainer' not in content:
+        return dicttoxml(content, root=False, attr_type=False)
+    parts = []
+    xml_element('MediaContainer', content['MediaContainer'], parts)
+    return ''.join(parts).encode('utf-8')
+
+
+def content_encoding(request):
+    """Choose the compression of a response, clients that only accept deflate get the cheaper zlib framing (adler32 instead of crc32).
+
+    Args:
+        request: The Flask request object containing the client's request details.
+
+    Returns:
+        The content encoding, either 'deflate' or 'gzip'.
+    """
+    if request.accept_encodings['deflate'] and not request.accept_encodings['gzip']:
+        return 'deflate'
+    return 'gzip'
+
+
+def format(content, request, compress=True):
     """Encode and format the response content based on the request's accepted MIME types.
 
     Args:
         content: The response content to be encoded and formatted.
         request: The Flask request object containing the client's request details.
+        compress: Whether to compress the content. Already compressed content like images should not be compressed again.
 
     Returns:
         A tuple containing the encoded content, HTTP status code, and response headers.
     """
+    # Werkzeug parses the Accept header on every access, so only look up the best match once
+    mimetype = request.accept_mimetypes.best
     # Convert content to XML or JSON based on request's accepted MIME types
-    if request.accept_mimetypes.best == 'application/xml' and isinstance(content, dict):
-        content = dicttoxml(content, root=False, attr_type=False)
-    elif isinstance(content, dict):
-        content = json.dumps(content).encode('utf-8')
-    # Compress the content and prepare headers for the response
+    if isinstance(content, dict):
+        if mimetype == 'application/xml':
+            content = xml_encode(content)
+        else:
+            content = common.json_dumps(content)
+    # Prepare the headers for the response
+    headers = RESPONSE_HEADERS.copy()
+    headers['Content-Type'] = mimetype
+    # Tiny responses would only grow through the gzip framing, so send them as they are
     uncompressed = len(content)
-    content = gzip_encode(content)
-    compressed = len(content)
-    headers = {
-        'X-Plex-Content-Original-Length': uncompressed,
-        'X-Plex-Content-Compressed-Length': compressed,
-        'Content-Encoding': 'gzip',
-        'Content-Type': request.accept_mimetypes.best,
-        'Access-Control-Allow-Origin': '*',
-        'X-Plex-Protocol': '1.0',
-        'Vary': 'Origin, X-Plex-Token',
-        'Connection': 'keep-alive'
-    }
+    if not compress or uncompressed < COMPRESSION_THRESHOLD:
+        return content, 200, headers
+    # Compress the content
+    encoding = content_encoding(request)
+    if encoding == 'deflate':
+        content = zlib_encode(content)
+    else:
+        content = gzip_encode(content)
+    headers['X-Plex-Content-Original-Length'] = uncompressed
+    headers['X-Plex-Content-Compressed-Length'] = len(content)
+    headers['Content-Encoding'] = encoding
     return content, 200, headers
 
 
 # Define global variables for managing state and locks for thread safety
-releases = None
-processing_lock = threading.Lock()
-processing = False
-search_lock = threading.Lock()
-last_search_time = 0
-last_search_term = ""
-data_store = {}
+scrapes = {}
+scraped = common.cache(maxsize=SCRAPE_CACHE_SIZE, ttl=SCRAPE_CACHE_TTL)
+scrapes_lock = threading.Lock()
+search_condition = threading.Condition()
+# The latest search per server and client, an entry is removed once its search is no longer debounced
+last_searches = {}
+data_store = common.cache(maxsize=DATA_STORE_SIZE, ttl=DATA_STORE_TTL)
+# Bounded, as the accepted mime type in the keys is chosen by the client
+formatted_responses = common.cache(maxsize=FORMATTED_RESPONSE_CACHE_SIZE, ttl=FORMATTED_RESPONSE_CACHE_TTL)
+
+
+def format_static(key, content, request):
+    """Format content that never changes only once per negotiated mime type and content encoding.
+
+    Args:
+        key: A hashable key identifying the content.
+        content: A callable returning the content, only called if the response is not formatted yet.
+        request: The Flask request object containing the client's request details.
+
+    Returns:
+        A tuple containing the encoded content, HTTP status code, and response headers.
+    """
+    key = (key, request.accept_mimetypes.best, content_encoding(request))
+    response = formatted_responses.get(key)
+    if response is None:
+        response = format(content(), request)
+        formatted_responses[key] = response
+    return response
+
+
+def store(releases):
+    """Keep a list of sorted releases around for later download requests.
+
+    Lists are dropped after DATA_STORE_TTL seconds, or earlier once more than DATA_STORE_SIZE lists are stored.
+
+    Args:
+        releases: The list of releases to store.
+
+    Returns:
+        The url safe, unguessable id under which the releases are stored.
+    """
+    unique_id = secrets.token_urlsafe(16)
+    data_store[unique_id] = releases
+    return unique_id
+
+
+def scrape(type, imdb, s, e):
+    """Scrape releases for a media item and check them against the debrid service.
+
+    Concurrent requests for the same item share a single scrape: the first request does the work
+    and every other request waits for its result. Requests for different items run in parallel.
+    Results are reused for SCRAPE_CACHE_TTL seconds, unless no releases were found.
+
+    Args:
+        type: The media type ('movie' or 'show').
+        imdb: The IMDb identifier of the media item.
+        s: A list of season numbers.
+        e: An episode number.
+
+    Returns:
+        The filtered list of cached releases. The list is shared between requests and must not be modified.
+    """
+    key = (type, imdb, tuple(s) if s else s, e)
+    releases = scraped.get(key)
+    if releases is not None:
+        return releases
+    with scrapes_lock:
+        future = scrapes.get(key)
+        if future:
+            running = True
+        else:
+            running = False
+            future = scrapes[key] = Future()
+    if running:
+        return future.result()
+    try:
+        releases = torrentio.scrape(type, imdb, s, e)
+        realdebrid.check(releases)
+        releases = common.releases.type_filter(releases, type, s, e)
+        # An empty result may come from a failed torrentio or debrid request, so only keep releases that were found
+        if releases:
+            scraped[key] = releases
+        future.set_result(releases)
+    except Exception as ex:
+        future.set_exception(ex)
+    finally:
+        with scrapes_lock:
+            del scrapes[key]
+    return future.result()
 
 
 @app.route('/media/providers', methods=['GET'])
@@ -147,13 +331,13 @@ def providers(server=mock_servers[0].IDENTIFIER):
         The response content, status code, and headers as formatted by the `format` function.
     """
     # Select the appropriate mock server based on the server identifier
-    mock_server = next((s for s in mock_servers if s.IDENTIFIER == server), None)
+    mock_server = servers_by_id.get(server)
     # Decode the request's full path
-    path = requests.utils.unquote(request.full_path)
+    path = unquote(request.full_path)
     # Get content from the mock server's provider method
-    content = mock_server.provider('includePreferences=1' in path)
+    mobile = 'includePreferences=1' in path
     # Format the content based on the request headers and return the response
-    content, code, headers = format(content, request)
+    content, code, headers = format_static((server, 'providers', mobile), lambda: mock_server.provider(mobile), request)
     return content, code, headers
 
 
@@ -171,12 +355,10 @@ def metadata(server, guid):
     Returns:
         The response content, status code, and headers as formatted by the `format` function.
     """
-    mock_server = next((s for s in mock_servers if s.IDENTIFIER == server), None)
+    mock_server = servers_by_id.get(server)
     if 'availabilities' in guid:
-        content = {}
-        content, code, headers = format(content, request)
-        return content, code, headers
-    content = mock_server.metadata(requests.utils.unquote(guid), request.args)
+        return format_static('{}', dict, request)
+    content = mock_server.metadata(unquote(guid), request.args)
     content, code, headers = format(content, request)
     return content, code, headers
 
@@ -200,64 +382,45 @@ def availability(server=None):
     """
     start_time = time.time()
 
-    mock_server = next((s for s in mock_servers if s.IDENTIFIER == server), None)
+    mock_server = servers_by_id.get(server)
 
-    path = requests.utils.unquote(request.full_path)
-    guid = regex.search(r'(?<=guid=)(.*?)(?=&)', path, regex.I).group()
-
-    global releases, processing, data_store
+    path = unquote(request.full_path)
+    guid = request.args.get('guid', '')
 
     if mock_server:
         mock_server = [mock_server]
     else:
         mock_server = mock_servers
 
-    with processing_lock:
-
-        if not processing:
-
-            processing = True
-
-            type, imdb, s, e = mock_server[0].identify(path)
-
-            releases = torrentio.scrape(type, imdb, s, e)
-
-            realdebrid.check(releases)
+    type, imdb, s, e = mock_server[0].identify(path)
 
-            common.releases.type_filter(releases, type, s, e)
+    releases = scrape(type, imdb, s, e)
 
-    local_releases = copy.deepcopy(releases)
+    metadata = []
 
-    time.sleep(0.05)
+    # A single server shows the release titles, multiple servers show the resolutions
+    resolution_key = 'title' if len(mock_server) == 1 else 'resolution'
 
-    processing = False
+    for server in mock_server:
 
-    metadata = []
+        local_releases = common.releases.sort(server, releases)
 
-    for server in mock_server:
+        unique_id = store(local_releases)
 
-        if len(mock_server) > 1:
-            local_releases = copy.deepcopy(releases)
-
-        local_releases = common.releases.sort(server, local_releases)
-
-        unique_id = str(uuid.uuid4())
-        data_store[unique_id] = local_releases
-
-        for i, release in enumerate(local_releases[:server.RESULTS]):
-            metadata += [{
-                "ratingKey": "2785",
-                "key": f"/download/{requests.utils.quote(unique_id)}/{i}",
-                "librarySectionID": 2,
-                "librarySectionKey": "/library/sections/2",
-                "guid": guid,
-                "librarySectionTitle": server.SERVERNAME,
-                "Media": [
-                    {
-                        "videoResolution": (release['title'] if len(mock_server) == 1 else release['resolution']),
-                    },
-                ],
-            },]
+        servername = server.SERVERNAME
+        metadata.extend({
+            "ratingKey": "2785",
+            "key": f"/download/{unique_id}/{i}",
+            "librarySectionID": 2,
+            "librarySectionKey": "/library/sections/2",
+            "guid": guid,
+            "librarySectionTitle": servername,
+            "Media": [
+                {
+                    "videoResolution": release[resolution_key],
+                },
+            ],
+        } for i, release in enumerate(local_releases[:server.RESULTS]))
 
     content = {
         "MediaContainer": {
@@ -277,9 +440,14 @@ def availability(server=None):
     return content, code, headers
 
 
+def search_cacheable(response):
+    """Keep the empty responses of superseded searches out of the cache, so a later identical search is answered."""
+    return not g.get('search_superseded', False)
+
+
 @app.route('/hubs/search', methods=['GET'])
 @app.route('/<path:server>/hubs/search', methods=['GET'])
-@cache.cached(timeout=300, query_string=True)
+@cache.cached(timeout=300, query_string=True, response_filter=search_cacheable)
 def search(server=None):
     """Handle search requests.
 
@@ -295,91 +463,67 @@ def search(server=None):
         The response content, status code, and headers as formatted by the `format` function.
     """
     start_time = time.time()
-    mock_server = next((s for s in mock_servers if s.IDENTIFIER == server), None)
+    mock_server = servers_by_id.get(server)
     query = request.args.get('query', '')
-    # Debounce the search
-    global last_search_time, releases, processing
-    with search_lock:
-        # Replace the old timer with the new one
-        last_search_time = time.time()
-        last_search_term = copy.deepcopy(query)
-    while True:
-        with search_lock:
-            # If a new search has been initiated by the same client, break the loop
-            if time.time() - last_search_time > 1:
-                break
-        time.sleep(0.1)
-    if not query == last_search_term:
-        content = {}
-        content, code, headers = format(content, request)
-        return content, code, headers
+    # Debounce the search per server and client, as plex sends every search to all servers at once
+    client = request.headers.get('X-Plex-Client-Identifier') or request.args.get('X-Plex-Client-Identifier') or request.remote_addr
+    search_key = (server, client)
+    search_token = object()
+    with search_condition:
+        # Replace the older search of this server and client, and wake up the searches waiting on it
+        last_searches[search_key] = search_token
+        search_condition.notify_all()
+        # Wait for the debounce window, or until a new search has been initiated and will do the work
+        superseded = search_condition.wait_for(lambda: last_searches.get(search_key) is not search_token, timeout=1)
+        if not superseded:
+            del last_searches[search_key]
+    if superseded:
+        g.search_superseded = True
+        return format_static('{}', dict, request)
     if mock_server:
         mock_server = [mock_server]
     else:
         mock_server = mock_servers
 
-    with processing_lock:
-
-        if not processing:
-
-            processing = True
-
-            type, imdb, s, e = torrentio.search(query)
-
-            releases = torrentio.scrape(type, imdb, s, e)
-
-            realdebrid.check(releases)
-
-            common.releases.type_filter(releases, type, s, e)
-
-    local_releases = copy.deepcopy(releases)
-
-    time.sleep(0.05)
+    type, imdb, s, e = torrentio.search(query)
 
-    processing = False
+    releases = scrape(type, imdb, s, e)
 
     metadata = []
 
     for server in mock_server:
 
-        if len(mock_server) > 1:
-            local_releases = copy.deepcopy(releases)
-
-        local_releases = common.releases.sort(server, local_releases)
-
-        unique_id = str(uuid.uuid4())
-        data_store[unique_id] = local_releases
-
-        for i, release in enumerate(local_releases[:server.RESULTS]):
-            metadata += [
-                {
-                    "librarySectionTitle": "Torrentio",
-                    "score": "1",
-                    "ratingKey": "",
-                    "key": f"/download/{requests.utils.quote(unique_id)}/{i}",
-                    "guid": release['title'],
-                    "studio": "Hyperobject Industries",
-                    "type": "movie",
-                    "title": release['title'],
-                    "librarySectionID": 1,
-                    "librarySectionKey": "/library/sections/1",
-                    "contentRating": "R",
-                    "summary": "",
-                    "rating": 5.5,
-                    "audienceRating": 7.8,
-                    "year": 2022,
-                    "tagline": "Based on truly possible events.",
-                    "thumb": "https://static.thenounproject.com/png/1390707-200.png",
-                    "art": "https://static.thenounproject.com/png/1390707-200.png",
-                    "duration": 8591530,
-                    "originallyAvailableAt": "2021-12-24",
-                    "addedAt": 1655228225,
-                    "updatedAt": 1655228225,
-                    "audienceRatingImage": "rottentomatoes://image.rating.upright",
-                    "primaryExtraKey": "/library/metadata/89",
-                    "ratingImage": "rottentomatoes://image.rating.rotten",
-                }
-            ]
+        local_releases = common.releases.sort(server, releases)
+
+        unique_id = store(local_releases)
+
+        metadata.extend({
+            "librarySectionTitle": "Torrentio",
+            "score": "1",
+            "ratingKey": "",
+            "key": f"/download/{unique_id}/{i}",
+            "guid": release['title'],
+            "studio": "Hyperobject Industries",
+            "type": "movie",
+            "title": release['title'],
+            "librarySectionID": 1,
+            "librarySectionKey": "/library/sections/1",
+            "contentRating": "R",
+            "summary": "",
+            "rating": 5.5,
+            "audienceRating": 7.8,
+            "year": 2022,
+            "tagline": "Based on truly possible events.",
+            "thumb": "https://static.thenounproject.com/png/1390707-200.png",
+            "art": "https://static.thenounproject.com/png/1390707-200.png",
+            "duration": 8591530,
+            "originallyAvailableAt": "2021-12-24",
+            "addedAt": 1655228225,
+            "updatedAt": 1655228225,
+            "audienceRatingImage": "rottentomatoes://image.rating.upright",
+            "primaryExtraKey": "/library/metadata/89",
+            "ratingImage": "rottentomatoes://image.rating.rotten",
+        } for i, release in enumerate(local_releases[:server.RESULTS]))
     content = {
         "MediaContainer": {
             "size": 18,
@@ -419,13 +563,19 @@ def download(server=mock_servers[0].IDENTIFIER, id="", num=0):
         The response content, status code, and headers as formatted by the `format` function.
     """
     start_time = time.time()
-    releases = data_store[id]
+    releases = data_store.get(id)
+    if releases is None:
+        # Stored lists expire after DATA_STORE_TTL seconds, the client has to search again
+        logger.warning(f"download id {id} is unknown or has expired")
+        return format_static('{}', dict, request)
     for release in releases[int(num):]:
+        # The download updates the release, so work on a copy to leave the stored results untouched
+        release = release.copy()
         if realdebrid.download(release):
             break
-    plex.library.refresh(release)
-    content = {}
-    content, code, headers = format(content, request)
+    # The refresh waits on the real plex server, run it in the background instead of holding the response
+    threading.Thread(target=plex.library.refresh, args=(release,), daemon=True).start()
+    content, code, headers = format_static('{}', dict, request)
     logger.info(f"took {time.time() - start_time:.2f}s")
     return content, code, headers
 
@@ -445,8 +595,8 @@ def agents(server):
     Returns:
         The response content, status code, and headers as formatted by the `format` function.
     """
-    mock_server = next((s for s in mock_servers if s.IDENTIFIER == server), None)
-    content = mock_server.agents(requests.utils.unquote(request.full_path))
+    mock_server = servers_by_id.get(server)
+    content = mock_server.agents(unquote(request.full_path))
     content, code, headers = format(content, request)
     return content, code, headers
 
@@ -472,7 +622,9 @@ def transcode(server):
         url = 'https://i.ibb.co/w4BnkC9/GwxAcDV.png'
     response = session.get(url)
     content = response.content
-    content, code, headers = format(content, request)
+    # Images are already compressed, so pass them through with their own content type
+    content, code, headers = format(content, request, compress=False)
+    headers['Content-Type'] = response.headers.get('Content-Type', headers['Content-Type'])
     return content, code, headers
 
 
@@ -494,9 +646,8 @@ def prefs(server=mock_servers[0].IDENTIFIER):
     Returns:
         The response content, status code, and headers as formatted by the `format` function.
     """
-    mock_server = next((s for s in mock_servers if s.IDENTIFIER == server), None)
-    content = mock_server.prefs()
-    content, code, headers = format(content, request)
+    mock_server = servers_by_id.get(server)
+    content, code, headers = format_static((server, 'prefs'), mock_server.prefs, request)
     return content, code, headers
 
 
@@ -524,8 +675,7 @@ def empty(server=mock_servers[0].IDENTIFIER):
     Returns:
         The response content, status code, and headers as formatted by the `format` function.
     """
-    content = {"MediaContainer": {"size": 0}}
-    content, code, headers = format(content, request)
+    content, code, headers = format_static('empty', lambda: {"MediaContainer": {"size": 0}}, request)
     return content, code, headers
 
 
@@ -535,8 +685,7 @@ if __name__ == "__main__":
     configure_logging()
 
     # Register mock servers for handling routes
-    for server in mock_servers:
-        server.register()
+    plex.register(mock_servers)
 
     # Log the information about ngrok public URL where the mock servers are running
     logging.info(f"mock servers running on ngrok https: {public_url}")
@@ -6,26 +6,128 @@ import logging
 from settings import settings
 
 import time
+import random
+import threading
+from email.utils import parsedate_to_datetime
+from collections import OrderedDict
+from functools import lru_cache
+import json
 import requests
-import regex
+from requests.adapters import HTTPAdapter
+import regex  # used by the rule and filter expressions from the settings
+import re
+
+# orjson is optional, it is used as a faster drop-in for the json module when it is installed
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # Create a logger object for this module
 logger = logging.getLogger(__name__)
 
 
+def json_dumps(content):
+    """Serialize content to utf-8 encoded json bytes.
+
+    Parameters:
+        content: The json serializable object.
+
+    Returns:
+        bytes: The encoded json.
+    """
+    if orjson:
+        return orjson.dumps(content)
+    return json.dumps(content).encode('utf-8')
+
+
+def json_loads(content):
+    """Deserialize json from bytes or str.
+
+    Parameters:
+        content (bytes|str): The json document.
+
+    Returns:
+        The decoded object.
+    """
+    if orjson:
+        return orjson.loads(content)
+    return json.loads(content)
+
+
+class cache:
+    """Thread safe dictionary with a maximum size and a time to live for its entries.
+
+    Entries expire once they are older than the time to live, and the oldest entries are dropped once the
+    cache holds more than the maximum size.
+
+    Attributes:
+        MAXSIZE (int): Maximum number of entries.
+        TTL (float): Time (in seconds) an entry is kept.
+    """
+
+    def __init__(self, maxsize=1024, ttl=600):
+        """Initialize a new cache instance.
+
+        Args:
+            maxsize (int): Maximum number of entries.
+            ttl (float): Time (in seconds) an entry is kept.
+        """
+        self.MAXSIZE = maxsize
+        self.TTL = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __setitem__(self, key, value):
+        with self._lock:
+            self._entries.pop(key, None)
+            self._entries[key] = (time.monotonic() + self.TTL, value)
+            while len(self._entries) > self.MAXSIZE:
+                self._entries.popitem(last=False)
+
+    def __getitem__(self, key):
+        with self._lock:
+            expires, value = self._entries[key]
+            if expires < time.monotonic():
+                del self._entries[key]
+                raise KeyError(key)
+            return value
+
+    def __contains__(self, key):
+        try:
+            self[key]
+            return True
+        except KeyError:
+            return False
+
+    def get(self, key, default=None):
+        """Return the value for key if it is cached and not expired, else default."""
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+
 class session(requests.Session):
     """Custom session class inheriting from requests.Session.
 
     This class provides per-instance rate limiting, automatic retry for
     certain error codes, and a default timeout.
 
+    GET and POST requests are rate limited by a token bucket each. A bucket holds up to `burst` tokens,
+    every request takes one, and one token is refilled per rate limit interval.
+
     Attributes:
         DEFAULT_TIMEOUT (int): Default timeout for requests.
         RETRY_CODES (list): List of HTTP status codes to be retried.
         MAX_RETRIES (int): Maximum number of retries.
-        GET_RATE_LIMIT (float): Time (in seconds) to wait between GET requests.
-        POST_RATE_LIMIT (float): Time (in seconds) to wait between POST requests.
-        last_request_time (float): Timestamp of the last request made.
+        GET_RATE_LIMIT (float): Time (in seconds) to wait between GET requests once the burst is used up.
+        POST_RATE_LIMIT (float): Time (in seconds) to wait between POST requests once the burst is used up.
+        BURST (int): Number of requests per method that can be made without waiting.
+        BACKOFF_FACTOR (float): Time (in seconds) to wait before the first retry, doubled for each further retry.
+        MAX_BACKOFF (float): Maximum time (in seconds) to wait before a retry.
+        buckets (dict): The available tokens and the time of the last refill per method.
+        buckets_lock (threading.Lock): Lock guarding the buckets, as sessions are shared between threads.
     """
 
     def __init__(self,
@@ -33,7 +135,12 @@ class session(requests.Session):
                  retry_codes=[429, 503],
                  max_retries=3,
                  get_rate_limit=0.01,
-                 post_rate_limit=0.01):
+                 post_rate_limit=0.01,
+                 burst=1,
+                 backoff_factor=0.5,
+                 max_backoff=30,
+                 pool_connections=16,
+                 pool_maxsize=32):
         """Initialize a new CustomSession instance.
 
         Args:
@@ -42,15 +149,84 @@ class session(requests.Session):
             max_retries (int): Maximum number of retries.
             get_rate_limit (float): Time (in seconds) to wait between GET requests.
             post_rate_limit (float): Time (in seconds) to wait between POST requests.
+            burst (int): Number of requests per method that can be made without waiting.
+            backoff_factor (float): Time (in seconds) to wait before the first retry, doubled for each further retry.
+            max_backoff (float): Maximum time (in seconds) to wait before a retry.
+            pool_connections (int): Number of hosts to keep connection pools for.
+            pool_maxsize (int): Maximum number of connections kept open per host.
         """
         super(session, self).__init__()
 
+        # Keep enough connections open for concurrent requests to reuse them instead of reconnecting.
+        # Retries are handled in request(), so the adapter does not retry itself.
+        adapter = HTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize)
+        self.mount('https://', adapter)
+        self.mount('http://', adapter)
+
         self.DEFAULT_TIMEOUT = timeout
         self.RETRY_CODES = retry_codes
         self.MAX_RETRIES = max_retries
         self.GET_RATE_LIMIT = get_rate_limit
         self.POST_RATE_LIMIT = post_rate_limit
-        self.last_request_time = 0
+        self.BURST = burst
+        self.BACKOFF_FACTOR = backoff_factor
+        self.MAX_BACKOFF = max_backoff
+        self.buckets = {
+            'GET': [burst, time.monotonic()],
+            'POST': [burst, time.monotonic()],
+        }
+        self.buckets_lock = threading.Lock()
+
+    def throttle(self, method):
+        """Wait until the token bucket of the method allows another request, and take a token from it.
+
+        Args:
+            method (str): HTTP method (e.g., 'GET', 'POST'). Other methods are not rate limited.
+        """
+        bucket = self.buckets.get(method)
+        if bucket is None:
+            return
+        # The rate limit attributes are read on every request, so changing them takes effect right away
+        rate_limit = self.GET_RATE_LIMIT if method == 'GET' else self.POST_RATE_LIMIT
+        # Only the bucket update is locked. The wait is reserved in the bucket before sleeping outside of the lock,
+        # so concurrent requests queue up behind each other without blocking on the sleep.
+        with self.buckets_lock:
+            now = time.monotonic()
+            # Refill the bucket by the time passed since the last refill, up to its capacity
+            tokens = min(self.BURST, bucket[0] + (now - bucket[1]) / rate_limit) if rate_limit else self.BURST
+            if tokens >= 1:
+                bucket[0], bucket[1] = tokens - 1, now
+                return
+            # Wait for the missing part of a token, which is then used up right away
+            delay = (1 - tokens) * rate_limit
+            bucket[0], bucket[1] = 0, now + delay
+        time.sleep(delay)
+
+    def backoff(self, retries, response=None):
+        """Calculate the time to wait before retrying a request.
+
+        A Retry-After header of the response is honored, otherwise the wait grows exponentially
+        with the number of retries, with some random jitter so concurrent retries spread out.
+
+        Args:
+            retries (int): Number of retries made so far, including the upcoming one.
+            response: The response that is retried, if any.
+
+        Returns:
+            float: Time (in seconds) to wait, at most MAX_BACKOFF.
+        """
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after:
+            try:
+                return min(self.MAX_BACKOFF, max(0, float(retry_after)))
+            except ValueError:
+                pass
+            try:
+                return min(self.MAX_BACKOFF, max(0, parsedate_to_datetime(retry_after).timestamp() - time.time()))
+            except (TypeError, ValueError):
+                pass
+        delay = self.BACKOFF_FACTOR * 2 ** (retries - 1)
+        return min(self.MAX_BACKOFF, delay + random.uniform(0, delay / 2))
 
     def request(self, method, url, **kwargs):
         """Override the request method to include rate limiting, retries, and default timeout.
@@ -68,26 +244,18 @@ class session(requests.Session):
             kwargs['timeout'] = self.DEFAULT_TIMEOUT
 
         # Ensure rate limiting
-        elapsed_time = time.time() - self.last_request_time
-        if method == 'GET' and elapsed_time < self.GET_RATE_LIMIT:
-            time.sleep(self.GET_RATE_LIMIT - elapsed_time)
-        elif method == 'POST' and elapsed_time < self.POST_RATE_LIMIT:
-            time.sleep(self.POST_RATE_LIMIT - elapsed_time)
+        self.throttle(method)
 
         retries = 0
         while retries < self.MAX_RETRIES:
             try:
                 response = super(session, self).request(method, url, **kwargs)
 
-                self.last_request_time = time.time()
-
                 if response.status_code in self.RETRY_CODES:
                     logger.error(f"request error: {response.status_code} - retrying...")
                     retries += 1
-                    if method == 'GET':
-                        time.sleep(self.GET_RATE_LIMIT)
-                    elif method == 'POST':
-                        time.sleep(self.POST_RATE_LIMIT)
+                    if retries < self.MAX_RETRIES:
+                        time.sleep(self.backoff(retries, response))
                     continue
 
                 return response
@@ -95,10 +263,8 @@ class session(requests.Session):
             except requests.RequestException as e:
                 logger.error(f"request error: {e}")
                 retries += 1
-                if method == 'GET':
-                    time.sleep(self.GET_RATE_LIMIT)
-                elif method == 'POST':
-                    time.sleep(self.POST_RATE_LIMIT)
+                if retries < self.MAX_RETRIES:
+                    time.sleep(self.backoff(retries))
 
         logger.error(f"failed to fetch URL {url} after {self.MAX_RETRIES} attempts")
         return None
@@ -136,22 +302,18 @@ class match:
     season and episode numbers, and language flags from file names.
     """
 
-    # Compiles a regex pattern to identify various video file extensions.
-    video_formats = regex.compile(
-        r'(\.)(YUV|WMV|WEBM|VOB|VIV|SVI|ROQ|RMVB|RM|OGV|OGG|NSV|MXF|MTS|M2TS|TS|MPG|MPEG|M2V|MP2|MPE|MPV|MP4|M4P|M4V|MOV|QT|MNG|MKV|FLV|DRC|AVI|ASF|AMV)$', regex.I)
-
-    # Compiles a regex pattern to identify various subtitle file extensions.
-    subtitle_formats = regex.compile(
-        r'(\.)(SRT|ASS|VTT|SUB|IDX|PGS)$', regex.I)
+    # Sets of video and subtitle file extensions, only the extension matters so a set lookup replaces a regex search.
+    video_extensions = frozenset({
+        'YUV', 'WMV', 'WEBM', 'VOB', 'VIV', 'SVI', 'ROQ', 'RMVB', 'RM', 'OGV', 'OGG', 'NSV', 'MXF', 'MTS', 'M2TS', 'TS',
+        'MPG', 'MPEG', 'M2V', 'MP2', 'MPE', 'MPV', 'MP4', 'M4P', 'M4V', 'MOV', 'QT', 'MNG', 'MKV', 'FLV', 'DRC', 'AVI',
+        'ASF', 'AMV'})
+    subtitle_extensions = frozenset({'SRT', 'ASS', 'VTT', 'SUB', 'IDX', 'PGS'})
 
     # Compiles a regex pattern to extract season numbers from file names.
-    season_formats = regex.compile(r'(?:season|s)[\.\-\_\s]?(\d+)', regex.I)
+    season_formats = re.compile(r'(?:season|s)[\.\-\_\s]?(\d+)', re.I)
 
     # Compiles a regex pattern to extract episode numbers from file names.
-    episode_formats = regex.compile(r'(?:episode|e)[\.\-\_\s]?(\d+)', regex.I)
-
-    # Compiles a regex pattern to identify files labeled as samples (usually not the main content).
-    sample_formats = regex.compile(r'(sample)', regex.I)
+    episode_formats = re.compile(r'(?:episode|e)[\.\-\_\s]?(\d+)', re.I)
 
     # A dictionary mapping Unicode flags to primary language codes.
     flag_to_primary_language = {
@@ -181,18 +343,68 @@ class match:
         "🇰🇮": "EN", "🇽🇰": "SQ", "🇰🇼": "AR", "🇰🇬": "KY", "🇱🇦": "LO",
         "🇱🇻": "LV", "🇱🇧": "AR", "🇱🇸": "EN", "🇱🇷": "EN", "🇱🇾": "AR",
         "🇱🇮": "DE", "🇱🇹": "LT", "🇱🇺": "FR", "🇲🇴": "ZH", "🇲🇬": "FR",
-        "🇲🇼": "EN", "🇲🇾": "MS", "🇲🇻": "DV", "🇬🇧": "EN", "🇩🇪": "DE",
-        "🇫🇷": "FR", "🇪🇸": "ES", "🇮🇹": "IT", "🇳🇿": "EN", "🇨🇺": "ES",
-        "🇷🇺": "RU", "🇨🇳": "ZH", "🇯🇵": "JA", "🇰🇷": "KO", "🇸🇦": "AR",
-        "🇹🇷": "TR", "🇮🇳": "HI", "🇮🇩": "ID", "🇧🇷": "PT", "🇵🇰": "UR",
-        "🇳🇬": "EN", "🇧🇩": "BN", "🇲🇽": "ES", "🇵🇭": "TL", "🇻🇳": "VI",
-        "🇪🇹": "AM", "🇪🇬": "AR", "🇩🇪": "DE", "🇮🇷": "FA", "🇹🇭": "TH",
-        "🇬🇧": "EN", "🇫🇷": "FR", "🇮🇹": "IT", "🇲🇦": "AR", "🇦🇺": "EN",
-        "🇲🇾": "MS", "🇺🇦": "UK", "🇿🇦": "ZU", "🇵🇱": "PL", "🇨🇴": "ES",
-        "🇦🇷": "ES", "🇨🇦": "EN", "🇲🇲": "MY", "🇻🇪": "ES", "🇵🇪": "ES",
-        "🇳🇵": "NE", "🇸🇬": "EN", "🇴🇲": "AR", "🇸🇪": "SE", "🇵🇹": "PT"
+        "🇲🇼": "EN", "🇲🇾": "MS", "🇲🇻": "DV", "🇬🇧": "EN", "🇪🇸": "ES",
+        "🇳🇿": "EN", "🇷🇺": "RU", "🇰🇷": "KO", "🇸🇦": "AR", "🇹🇷": "TR",
+        "🇵🇰": "UR", "🇳🇬": "EN", "🇲🇽": "ES", "🇵🇭": "TL", "🇻🇳": "VI",
+        "🇹🇭": "TH", "🇲🇦": "AR", "🇺🇦": "UK", "🇿🇦": "ZU", "🇵🇱": "PL",
+        "🇲🇲": "MY", "🇻🇪": "ES", "🇵🇪": "ES", "🇳🇵": "NE", "🇸🇬": "EN",
+        "🇴🇲": "AR", "🇸🇪": "SE", "🇵🇹": "PT"
     }
 
+    @staticmethod
+    @lru_cache(maxsize=4096)
+    def classify(filename):
+        """
+        Determines the video, subtitle, season and episode information of a filename at once.
+
+        The extension is looked up once for both video and subtitle files. Season and episode
+        numbers are searched separately, as they may overlap in the filename (e.g. "s01e02").
+        The same files show up in several versions of a release, so results are cached per filename.
+        The returned dict is shared between callers and must not be modified.
+
+        Parameters:
+            filename (str): The filename to classify.
+
+        Returns:
+            dict: The same results as `video`, `subtitle`, `season` and `episode`, keyed by those names.
+        """
+        extension = match.extension(filename)
+        season_match = match.season_formats.search(filename)
+        episode_match = match.episode_formats.search(filename)
+        return {
+            'video': extension in match.video_extensions and not match.sample(filename),
+            'subtitle': extension in match.subtitle_extensions,
+            'season': int(season_match.group(1)) if season_match else None,
+            'episode': int(episode_match.group(1)) if episode_match else None,
+        }
+
+    @staticmethod
+    def extension(filename):
+        """
+        Extracts the upper case extension of a given filename.
+
+        Parameters:
+            filename (str): The filename from which to extract the extension.
+
+        Returns:
+            str: The extension without the dot, or an empty string if the filename has none.
+        """
+        _, dot, extension = filename.rpartition('.')
+        return extension.upper() if dot else ''
+
+    @staticmethod
+    def sample(filename):
+        """
+        Determines if a given filename is labeled as a sample (usually not the main content).
+
+        Parameters:
+            filename (str): The filename to check.
+
+        Returns:
+            bool: True if the filename contains "sample" in any case; False otherwise.
+        """
+        return 'sample' in filename.lower()
+
     @staticmethod
     def video(filename):
         """
@@ -204,7 +416,7 @@ class match:
         Returns:
             bool: True if the filename matches a video format and is not a sample; False otherwise.
         """
-        return bool(regex.search(match.video_formats, filename) and not regex.search(match.sample_formats, filename))
+        return match.extension(filename) in match.video_extensions and not match.sample(filename)
 
     @staticmethod
     def subtitle(filename):
@@ -217,7 +429,7 @@ class match:
         Returns:
             bool: True if the filename matches a subtitle format; False otherwise.
         """
-        return bool(regex.search(match.subtitle_formats, filename))
+        return match.extension(filename) in match.subtitle_extensions
 
     @staticmethod
     def season(filename):
@@ -230,7 +442,7 @@ class match:
         Returns:
             int or None: The season number if found; otherwise, None.
         """
-        season_match = regex.search(match.season_formats, filename)
+        season_match = match.season_formats.search(filename)
         return int(season_match.group(1)) if season_match else None
 
     @staticmethod
@@ -244,7 +456,7 @@ class match:
         Returns:
             int or None: The episode number if found; otherwise, None.
         """
-        episode_match = regex.search(match.episode_formats, filename)
+        episode_match = match.episode_formats.search(filename)
         return int(episode_match.group(1)) if episode_match else None
 
 
@@ -261,152 +473,142 @@ class releases:
     """
 
     @staticmethod
-    def print(list):
+    def print(releases_list):
         """
         Formats a list of release dictionaries for printing, with each attribute
         aligned for easy reading.
 
         Parameters:
-            list (list of dict): A list of release dictionaries to format.
+            releases_list (list of dict): A list of release dictionaries to format.
 
         Returns:
             list of str: A list of formatted strings ready for printing.
         """
-        # Initialize variables to hold the maximum length of each attribute.
-        longest_res, longest_cached, longest_title = 0, 0, 0
-        longest_size, longest_langs, longest_index, longest_seeders = 0, 0, 0, 0
-
-        # Calculate the longest attribute length for formatting purposes.
-        for index, release in enumerate(list):
-            # Round the size to two decimal places for display.
-            release['printsize'] = str(round(release['size'], 2))
-
-            # Update the maximum length for each attribute if the current one is longer.
-            longest_cached = max(longest_cached, len('/'.join(release['cached'])))
-            longest_title = max(longest_title, len(release['title']))
-            longest_res = max(longest_res, len(str(release['resolution'])))
-            longest_size = max(longest_size, len(release['printsize']))
-            longest_langs = max(longest_langs, len('/'.join(release['languages'])))
-            longest_seeders = max(longest_seeders, len(str(release['seeders'])))
-            longest_index = max(longest_index, len(str(index + 1)))
+        if not releases_list:
+            return []
+
+        # Convert each attribute to its display string once.
+        rows = [
+            (
+                str(index + 1),
+                str(release['resolution']),
+                '/'.join(release['languages']),
+                release['title'],
+                # Round the size to two decimal places for display.
+                str(round(release['size'], 2)),
+                '/'.join(release['cached']),
+                str(release['seeders']),
+                release['source'],
+            )
+            for index, release in enumerate(releases_list)
+        ]
+
+        # Calculate the longest attribute length for formatting purposes, one column at a time.
+        longest_index, longest_res, longest_langs, longest_title, longest_size, longest_cached, longest_seeders, _ = (
+            max(map(len, column)) for column in zip(*rows)
+        )
 
         # Construct formatted string for each release.
-        strings = []
-        for index, release in enumerate(list):
-            # Format each attribute with appropriate spacing.
-            i = f"{index + 1}) {' ' * (longest_index - len(str(index + 1)))}"
-            resolution = f"resolution: {release['resolution']}{' ' * (longest_res - len(str(release['resolution'])))}"
-            langs = f" | languages: {'/'.join(release['languages'])}{' ' * (longest_langs - len('/'.join(release['languages'])))}"
-            title = f" | title: {release['title']}{' ' * (longest_title - len(release['title']))}"
-            size = f" | size: {release['printsize']}{' ' * (longest_size - len(release['printsize']))}"
-            cached = f" | cached: {'/'.join(release['cached'])}{' ' * (longest_cached - len('/'.join(release['cached'])))}"
-            seeders = f" | seeders: {release['seeders']}{' ' * (longest_seeders - len(str(release['seeders'])))}"
-            source = f" | source: {release['source']}"
-
-            # Append the formatted string to the list.
-            strings.append(i + resolution + langs + title + size + cached + seeders + source)
+        strings = [
+            f"{i + ')':<{longest_index + 1}} "
+            f"resolution: {resolution:<{longest_res}}"
+            f" | languages: {langs:<{longest_langs}}"
+            f" | title: {title:<{longest_title}}"
+            f" | size: {size:<{longest_size}}"
+            f" | cached: {cached:<{longest_cached}}"
+            f" | seeders: {seeders:<{longest_seeders}}"
+            f" | source: {source}"
+            for i, resolution, langs, title, size, cached, seeders, source in rows
+        ]
 
         # Return the list of formatted strings.
         return strings
 
     @staticmethod
-    def type_filter(list, type, s, e):
+    def type_filter(releases_list, type, s, e):
         """
         Filters a list of releases based on the media type and provided season and episode numbers.
 
+        The given list is left untouched, the remaining releases get their versions filtered and their type set.
+
         Parameters:
-            list (list of dict): The list of release dictionaries to filter.
+            releases_list (list of dict): The list of release dictionaries to filter.
             type (str): The type of media ('movie' or 'show').
             s (list): A list of season numbers.
             e (int): An episode number.
 
         Returns:
-            list of dict: The filtered list of release dictionaries.
+            list of dict: A new, filtered list of release dictionaries.
         """
-        # Filter logic for movies.
+        # Pick the condition a release (and each of its versions) has to meet to be kept.
         if type == 'movie':
-            # Remove releases without videos and versions without videos.
-            # Set type to 'movie' for remaining releases.
-            for release in list[:]:
-                if release['videos'] == 0:
-                    list.remove(release)
-                    continue
-                for version in release['versions'][:]:
-                    if version['videos'] == 0:
-                        release['versions'].remove(version)
-            for release in list:
-                release['type'] = "movie"
-            return list
-
-        seasons = set(s)
-
-        # Filter logic for shows with multiple seasons.
-        if len(s) > 1:
-            # Remove releases that do not match the required seasons or have too few episodes.
-            # Set type to 'show' for remaining releases.
-            for release in list[:]:
-                if len(seasons - set(release['seasons'])) > len(s) / 2 or release['episodes'] <= 1:
-                    list.remove(release)
-                    continue
-                for version in release['versions'][:]:
-                    if len(seasons - set(version['seasons'])) > len(s) / 2 or version['episodes'] <= 1:
-                        release['versions'].remove(version)
-            for release in list:
-                release['type'] = "show"
-            return list
-
-        # Filter logic for a single season without specifying episodes.
-        if not e:
-            # Remove releases that do not match the required season or have too few episodes.
-            # Set type to 'show' for remaining releases.
-            for release in list[:]:
-                if seasons - set(release['seasons']) or release['episodes'] <= 1:
-                    list.remove(release)
-                    continue
-                for version in release['versions'][:]:
-                    if seasons - set(version['seasons']) or version['episodes'] <= 1:
-                        release['versions'].remove(version)
-            for release in list:
-                release['type'] = "show"
-            return list
-
-        # Filter logic for a single season with a specific episode.
-        for release in list[:]:
-            # Remove releases that do not match the required season or episode.
-            # Set type to 'show' for remaining releases.
-            if seasons - set(release['seasons']) or not release['episodes'] == 1:
-                list.remove(release)
-                continue
-            for version in release['versions'][:]:
-                if seasons - set(version['seasons']) or not version['episodes'] == 1:
-                    release['versions'].remove(version)
-            for release in list:
-                release['type'] = "show"
+            # Movies need at least one video.
+            def keep(item):
+                return item['videos'] != 0
+        else:
+            # The set methods accept the season lists of the items directly, without building a set per item.
+            seasons = frozenset(s)
+            if len(s) > 1:
+                # Shows with multiple seasons need at least half of the seasons and more than one episode.
+                half = len(s) / 2
+
+                def keep(item):
+                    return not (len(seasons.difference(item['seasons'])) > half or item['episodes'] <= 1)
+            elif not e:
+                # A single season without an episode needs the season and more than one episode.
+                def keep(item):
+                    return seasons.issubset(item['seasons']) and item['episodes'] > 1
+            else:
+                # A single season with a specific episode needs the season and exactly one episode.
+                def keep(item):
+                    return seasons.issubset(item['seasons']) and item['episodes'] == 1
+
+        # Keep the releases and versions that meet the condition in a single pass each,
+        # and set the type of the remaining releases.
+        filtered = [release for release in releases_list if keep(release)]
+        for release in filtered:
+            release['versions'] = [version for version in release['versions'] if keep(version)]
+            release['type'] = "movie" if type == 'movie' else "show"
 
         # Return the filtered list after applying all conditions.
-        return list
+        return filtered
 
-    def sort(server, list):
+    @staticmethod
+    def compile(expression):
         """
-        Sorts a list of releases based on server-defined rules and filters.
+        Compiles a rule or filter expression from the settings into a function of a release.
+
+        The expression is compiled once, instead of being parsed by eval() for every release it is applied to.
+        It is evaluated in the namespace of this module, so expressions can keep using e.g. `regex`.
 
         Parameters:
-            server: The server object with defined FILTERS and RULES.
-            list (list of dict): The list of release dictionaries to sort.
+            expression (str): A python expression referring to the release as `release`.
 
         Returns:
-            list of dict: The sorted list of release dictionaries.
+            function: A function taking a release dictionary and returning the value of the expression.
         """
-        # Apply server filters to the list.
-        for filter in server.FILTERS:
-            list = [release for release in list if eval(filter)]
+        return eval(f"lambda release: ({expression})")
 
-        # Sort the list based on the number of episodes, descending.
-        list.sort(key=lambda x: x['episodes'], reverse=True)
+    def sort(server, releases_list):
+        """
+        Sorts a list of releases based on server-defined rules and filters.
 
-        # Apply server rules for further sorting.
-        for rule in server.RULES:
-            list.sort(key=lambda release: eval(rule), reverse=True)
+        Parameters:
+            server: The server object with defined FILTERS and RULES, compiled by `releases.compile`.
+            releases_list (list of dict): The list of release dictionaries to sort.
 
-        # Return the sorted list.
-        return list
+        Returns:
+            list of dict: A new sorted list of release dictionaries, the given list is left untouched.
+        """
+        filters = server.FILTERS
+        rules = server.RULES
+
+        # Apply all server filters in a single pass over the list, and sort the remaining releases
+        # by the server rules in order of priority, then by the number of episodes, descending.
+        # A single sort on a key tuple orders the same as one stable sort per rule, but computes each key only once.
+        # sorted() returns a new list, so the callers list is never reordered.
+        return sorted(
+            (release for release in releases_list if all(filter(release) for filter in filters)),
+            key=lambda release: (*[rule(release) for rule in rules], release['episodes']),
+            reverse=True,
+        )
@@ -3,17 +3,43 @@
 import logging
 from settings import settings
 from modules import common
-import json
-import time
+from concurrent.futures import ThreadPoolExecutor
 
 # Create a logger object for this module
 logger = logging.getLogger(__name__)
 
-# Establish a new session with specified rate limits and retry codes
-session = common.session(get_rate_limit=1, retry_codes=[429, 503, 404, 400, 500])
-
 # Retrieve the API key for realdebrid from settings
 TOKEN = settings.get('realdebrid api key')
+# Authorization header sent with every request
+HEADERS = {'authorization': f'Bearer {TOKEN}'}
+
+# Number of hashes checked per instantAvailability request, keeps the request url at a safe length
+CHECK_BATCH_SIZE = 40
+# Maximum number of instantAvailability requests in flight at once
+CHECK_WORKERS = 8
+# Maximum number of links unrestricted at once
+UNRESTRICT_WORKERS = 8
+
+# Establish a new session with specified rate limits and retry codes.
+# The burst lets all availability batches start at once, realdebrid allows 250 requests per minute.
+session = common.session(get_rate_limit=1, burst=CHECK_WORKERS, retry_codes=[429, 503, 404, 400, 500])
+
+
+def availability(hashes):
+    """
+    Get the instant availability of a batch of hashes from realdebrid.
+
+    Parameters:
+        hashes (list): A list of torrent hashes.
+
+    Returns:
+        dict: The cached file combinations per hash, as returned by realdebrid.
+    """
+    response = session.get(
+        url=f'https://api.real-debrid.com/rest/1.0/torrents/instantAvailability/{"/".join(hashes)}',
+        headers=HEADERS
+    )
+    return common.json_loads(response.content)
 
 
 def check(releases):
@@ -38,15 +64,15 @@ def check(releases):
         return releases
 
     try:
-        # Perform the cache check with the realdebrid API
-        response = session.get(
-            url=f'https://api.real-debrid.com/rest/1.0/torrents/instantAvailability/{"/".join(hashes)}',
-            headers={'authorization': f'Bearer {TOKEN}'}
-        )
-        response = json.loads(response.content)
+        # Perform the cache check with the realdebrid API, in batches that are requested concurrently
+        batches = [hashes[i:i + CHECK_BATCH_SIZE] for i in range(0, len(hashes), CHECK_BATCH_SIZE)]
+        response = {}
+        with ThreadPoolExecutor(max_workers=min(CHECK_WORKERS, len(batches))) as executor:
+            for batch in executor.map(availability, batches):
+                response.update(batch)
 
         # Filter out releases not cached on realdebrid
-        releases[:] = [release for release in releases if release['hash'] in response and 'rd' in response[release['hash']] and response[release['hash']]['rd']]
+        releases[:] = [release for release in releases if (entry := response.get(release['hash'])) and 'rd' in entry and entry['rd']]
 
         # Enrich each release with version information based on the cache check
         for release in releases:
@@ -57,11 +83,8 @@ def check(releases):
                         'name': files[id]['filename'],
                         'size': files[id]['filesize'] / (8 * 1024 * 1024 * 1024),  # Convert size to GB
                         'id': id,
-                        'video': common.match.video(files[id]['filename']),
-                        'subtitle': common.match.subtitle(files[id]['filename']),
-                        'season': common.match.season(files[id]['filename']),
-                        'episode': common.match.episode(files[id]['filename'])
                     }
+                    file.update(common.match.classify(file['name']))
                     version['files'].append(file)
                     version['size'] += file['size']
                     version['videos'] += int(file['video'])
@@ -110,9 +133,9 @@ def download(release):
         response = session.post(
             url='https://api.real-debrid.com/rest/1.0/torrents/addMagnet',
             data={'magnet': release['magnet']},
-            headers={'authorization': f'Bearer {TOKEN}'}
+            headers=HEADERS
         )
-        response = json.loads(response.content)
+        response = common.json_loads(response.content)
         torrent_id = response['id']
 
         for version in release['versions']:
@@ -122,15 +145,14 @@ def download(release):
                 session.post(
                     url=f'https://api.real-debrid.com/rest/1.0/torrents/selectFiles/{torrent_id}',
                     data={'files': ','.join(ids)},
-                    headers={'authorization': f'Bearer {TOKEN}'}
+                    headers=HEADERS
                 )
                 # Fetch the torrent info to check if the files are ready
                 response = session.get(
                     url=f'https://api.real-debrid.com/rest/1.0/torrents/info/{torrent_id}',
-                    headers={'authorization': f'Bearer {TOKEN}'}
+                    headers=HEADERS
                 )
-                time.sleep(0.05)  # A short delay to prevent API rate limit issues
-                response = json.loads(response.content)
+                response = common.json_loads(response.content)
 
                 if len(response['links']) == len(ids):
                     # If all selected files are ready, set the download information
@@ -144,7 +166,7 @@ def download(release):
                     session.request(
                         method='DELETE',
                         url=f'https://api.real-debrid.com/rest/1.0/torrents/delete/{torrent_id}',
-                        headers={'authorization': f'Bearer {TOKEN}'}
+                        headers=HEADERS
                     )
             except Exception as e:
                 logger.exception(f"An error occurred during file selection or retrieval: {e}")
@@ -153,12 +175,9 @@ def download(release):
         if release.get('download'):
             # If downloads are available, initiate the unrestricted download process
             logger.info(f"Added {release['title']} to realdebrid")
-            for link in release['download']:
-                session.post(
-                    url='https://api.real-debrid.com/rest/1.0/unrestrict/link',
-                    data={'link': link},
-                    headers={'authorization': f'Bearer {TOKEN}'}
-                )
+            # The links are independent of each other, unrestrict them concurrently
+            with ThreadPoolExecutor(max_workers=min(UNRESTRICT_WORKERS, len(release['download']))) as executor:
+                list(executor.map(unrestrict, release['download']))
             release['files'] = version['files']
             return True
 
@@ -166,3 +185,17 @@ def download(release):
         logger.exception(f"An error occurred during the download process: {e}")
 
     return False
+
+
+def unrestrict(link):
+    """
+    Unrestrict a download link of a torrent on realdebrid.
+
+    Parameters:
+        link (str): The link to unrestrict.
+    """
+    session.post(
+        url='https://api.real-debrid.com/rest/1.0/unrestrict/link',
+        data={'link': link},
+        headers=HEADERS
+    )
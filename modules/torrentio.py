@@ -3,7 +3,6 @@
 import logging
 from settings import settings
 from modules import common
-import json
 import time
 import regex
 
@@ -18,6 +17,19 @@ MANIFEST = settings.get("torrentio manifest",
                         "https://torrentio.strem.fun/sort=qualitysize|qualityfilter=480p,scr,cam/manifest.json")
 OPTIONS = MANIFEST.split('/')[-2]
 
+# Patterns to extract the release details from the title of a torrentio stream
+FLAG_PATTERN = regex.compile(r'[\U0001F1E6-\U0001F1FF][\U0001F1E6-\U0001F1FF]')
+RESOLUTION_PATTERN = regex.compile(r'(2160|1080|720|480)(?=p|i)', regex.I)
+SIZE_GB_PATTERN = regex.compile(r'(?<=💾 )([0-9]+.?[0-9]+)(?= GB)')
+SIZE_MB_PATTERN = regex.compile(r'(?<=💾 )([0-9]+.?[0-9]+)(?= MB)')
+SEEDERS_PATTERN = regex.compile(r'(?<=👤 )([0-9]+)')
+SOURCE_PATTERN = regex.compile(r'(?<=⚙️ )(.*)(?=\n|$)')
+# Pattern to find an IMDb identifier in a search query
+IMDB_PATTERN = regex.compile(r'(tt[0-9]+)', regex.I)
+
+# Cinemeta search results are kept for 10 minutes, repeated searches for the same title skip the request
+catalogs = common.cache(maxsize=1024, ttl=600)
+
 
 def scrape(type, imdb, s, e):
     """
@@ -47,31 +59,36 @@ def scrape(type, imdb, s, e):
         # Fetch the streaming data from torrentio
         response = session.get(
             f'https://torrentio.strem.fun/{OPTIONS}/stream/{type}/{imdb}{f":{s}:{e}" if type == "series" else ""}.json')
-        response = json.loads(response.content)
+        response = common.json_loads(response.content)
 
         # Return early if no streams are found
         if 'streams' not in response:
             return scraped_releases
 
+        primary_language = common.match.flag_to_primary_language
+
         # Process each stream result
         for result in response['streams']:
             try:
                 # Extract relevant data from each stream
                 title = result['title'].split('\n')[0].replace(' ', '.')
-                languages = ['EN']
-                matches = regex.findall(
-                    r'[\U0001F1E6-\U0001F1FF][\U0001F1E6-\U0001F1FF]', result['title'])
-                if matches:
-                    languages = matches
-                for i, language in enumerate(languages):
-                    if language in common.match.flag_to_primary_language:
-                        languages[i] = common.match.flag_to_primary_language[language]
-                resolution = int(regex.findall(r'(2160|1080|720|480)(?=p|i)', str(result['title']), regex.I)[0]) if regex.search(r'(2160|1080|720|480)(?=p|i)', str(result['title']), regex.I) else 0
-                size = (float(regex.search(r'(?<=💾 )([0-9]+.?[0-9]+)(?= GB)', result['title']).group()) if regex.search(r'(?<=💾 )([0-9]+.?[0-9]+)(?= GB)', result['title']) else float(regex.search(r'(?<=💾 )([0-9]+.?[0-9]+)(?= MB)', result['title']).group()) / 1000 if regex.search(r'(?<=💾 )([0-9]+.?[0-9]+)(?= MB)', result['title']) else 0)
-                link = 'magnet:?xt=urn:btih:' + result['infoHash'] + '&dn=&tr='
+                # Map the flags to their primary language, flags without a known language are kept as they are
+                languages = [primary_language.get(flag, flag) for flag in FLAG_PATTERN.findall(result['title'])] or ['EN']
+                # Search each pattern once and reuse the match for the value
+                match = RESOLUTION_PATTERN.search(result['title'])
+                resolution = int(match.group()) if match else 0
+                match = SIZE_GB_PATTERN.search(result['title'])
+                if match:
+                    size = float(match.group())
+                else:
+                    match = SIZE_MB_PATTERN.search(result['title'])
+                    size = float(match.group()) / 1000 if match else 0
+                link = f"magnet:?xt=urn:btih:{result['infoHash']}&dn=&tr="
                 hash = result['infoHash'].lower()
-                seeds = (int(regex.search(r'(?<=👤 )([0-9]+)', result['title']).group()) if regex.search(r'(?<=👤 )([1-9]+)', result['title']) else 0)
-                source = ((regex.search(r'(?<=⚙️ )(.*)(?=\n|$)', result['title']).group()) if regex.search(r'(?<=⚙️ )(.*)(?=\n|$)', result['title']) else "unknown")
+                match = SEEDERS_PATTERN.search(result['title'])
+                seeds = int(match.group()) if match else 0
+                match = SOURCE_PATTERN.search(result['title'])
+                source = match.group() if match else "unknown"
 
                 # Construct the release dictionary
                 release = {
@@ -114,27 +131,42 @@ def search(query):
     e = common.match.episode(query)
     if not s == [None]:
         type = "show"
-    if regex.search(r'(tt[0-9]+)', query, regex.I):
-        imdb = regex.search(r'(tt[0-9]+)', query, regex.I).group()
+    match = IMDB_PATTERN.search(query)
+    if match:
+        imdb = match.group()
     else:
         if type == "show":
-            query = regex.sub(common.match.season_formats, '', query)
-            query = regex.sub(common.match.episode_formats, '', query)
-            response = session.get(
-                url=f"https://v3-cinemeta.strem.io/catalog/series/top/search={query}.json"
-            )
-            meta = json.loads(response.content)
+            query = common.match.season_formats.sub('', query)
+            query = common.match.episode_formats.sub('', query)
+            meta = catalog('series', query)
         else:
-            response = session.get(
-                url=f"https://v3-cinemeta.strem.io/catalog/movie/top/search={query}.json"
-            )
-            meta = json.loads(response.content)
+            meta = catalog('movie', query)
             type = "movie"
             if "metas" not in meta or len(meta['metas']) == 0:
-                response = session.get(
-                    url=f"https://v3-cinemeta.strem.io/catalog/series/top/search={query}.json"
-                )
-                meta = json.loads(response.content)
+                meta = catalog('series', query)
                 type = "show"
         imdb = meta['metas'][0]['imdb_id']
     return type, imdb, s, e
+
+
+def catalog(type, query):
+    """
+    Search the cinemeta catalog of a type, reusing recent results for the same query.
+
+    Parameters:
+        type (str): The catalog to search, either 'series' or 'movie'.
+        query (str): The search query.
+
+    Returns:
+        dict: The search results as returned by cinemeta. The result is shared between callers and must not be modified.
+    """
+    meta = catalogs.get((type, query))
+    if meta is None:
+        response = session.get(
+            url=f"https://v3-cinemeta.strem.io/catalog/{type}/top/search={query}.json"
+        )
+        meta = common.json_loads(response.content)
+        # Only keep successful responses, a failed search is tried again next time
+        if response.status_code == 200:
+            catalogs[(type, query)] = meta
+    return meta
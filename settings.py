@@ -13,6 +13,7 @@ Example:
 """
 
 import json
+import os
 
 
 class SettingsManager:
@@ -49,11 +50,14 @@ class SettingsManager:
     def save(self):
         """Save the current settings to the JSON file.
 
-        Writes the contents of the `settings` dictionary back to the JSON file.
+        Writes the contents of the `settings` dictionary to a temporary file next to the JSON file
+        and then replaces it, so the settings file is never left half written.
 
         """
-        with open(self.settings_file, 'w') as f:
+        temporary_file = self.settings_file + '.tmp'
+        with open(temporary_file, 'w') as f:
             json.dump(self.settings, f, indent=4)
+        os.replace(temporary_file, self.settings_file)
 
     def get(self, key, default=None):
         """Retrieve a setting value by its key.
@@ -69,11 +73,16 @@ class SettingsManager:
     def set(self, key, value):
         """Set a setting value by its key.
 
+        The file is only written if the value differs from the stored one. Values are compared,
+        so pass a new object instead of changing the one returned by `get` in place.
+
         Args:
             key (str): The key for the setting.
             value: The value to set.
 
         """
+        if key in self.settings and self.settings[key] == value:
+            return
         self.settings[key] = value
         self.save()
 